@@ -0,0 +1,10 @@
+fn main() -> Result<(), Box<dyn std::error::Error>> {
+
+    // generates the Embedder gRPC client used by cache::get_embedding_grpc
+    tonic_build::configure()
+        .build_server(false)
+        .compile_protos(&["proto/embedding.proto"], &["proto"])?;
+
+    Ok(())
+
+}
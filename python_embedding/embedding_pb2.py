@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: embedding.proto
+# Protobuf Python Version: 4.25.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x65mbedding.proto\x12\tembedding\"\x1c\n\x0c\x45mbedRequest\x12\x0c\n\x04text\x18\x01 \x01(\t\"/\n\rEmbedResponse\x12\x11\n\tembedding\x18\x01 \x01(\x0c\x12\x0b\n\x03\x64im\x18\x02 \x01(\x05\x32\x46\n\x08\x45mbedder\x12:\n\x05\x45mbed\x12\x17.embedding.EmbedRequest\x1a\x18.embedding.EmbedResponseb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'embedding_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  _globals['_EMBEDREQUEST']._serialized_start=30
+  _globals['_EMBEDREQUEST']._serialized_end=58
+  _globals['_EMBEDRESPONSE']._serialized_start=60
+  _globals['_EMBEDRESPONSE']._serialized_end=107
+  _globals['_EMBEDDER']._serialized_start=109
+  _globals['_EMBEDDER']._serialized_end=179
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,95 @@
+"""
+Export all-MiniLM-L6-v2 to ONNX, fuse it with ORT's transformer optimizations and apply
+dynamic INT8 quantization.
+
+Run once before starting the embedding service (the Dockerfile does this at build time):
+
+    pip install -r requirements-export.txt
+    python export_model.py
+
+Writes the optimized FP32 graph, the optimized INT8 graph and the tokenizer files to MODEL_DIR (default: ./onnx_model),
+which is where main.py loads them from.
+"""
+
+import os
+
+import torch
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTOptimizer, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoOptimizationConfig, AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_DIR = os.getenv("MODEL_DIR", "onnx_model")
+# plain FP32 export, the reference the served graphs are validated against
+EXPORTED_FILE = "model.onnx"
+# files served by main.py (see MODEL_FILES there)
+OPTIMIZED_FILE = "model_optimized.onnx"
+QUANTIZED_FILE = "model_optimized_quantized.onnx"
+
+# representative prompts used to check the served models against the plain FP32 export
+VALIDATION_TEXTS = [
+    "What is Rust?",
+    "user: How do I fix 'borrowed value does not live long enough' in Rust?",
+    "Explain the difference between Redis and Qdrant for caching LLM responses.",
+    "Why does my Docker container exit immediately with code 137?",
+    "user: Write a Python function that retries an HTTP request with exponential backoff.",
+    "What are the tradeoffs between microservices and a monolith for a small team?",
+]
+# fail the export if any validation prompt drifts further than this from the reference embedding
+MIN_COSINE_SIMILARITY = 0.97
+
+
+@torch.inference_mode()
+def sentence_embeddings(model, tokenizer, texts):
+    inputs = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+    token_embeddings = model(**inputs).last_hidden_state
+    mask = inputs["attention_mask"].unsqueeze(-1).float()
+    pooled = (token_embeddings * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+    return torch.nn.functional.normalize(pooled, dim=1)
+
+
+def validate(tokenizer):
+    reference = ORTModelForFeatureExtraction.from_pretrained(MODEL_DIR, file_name=EXPORTED_FILE)
+    expected = sentence_embeddings(reference, tokenizer, VALIDATION_TEXTS)
+
+    for file_name in (OPTIMIZED_FILE, QUANTIZED_FILE):
+        model = ORTModelForFeatureExtraction.from_pretrained(MODEL_DIR, file_name=file_name)
+        similarities = (expected * sentence_embeddings(model, tokenizer, VALIDATION_TEXTS)).sum(1)
+        min_similarity = similarities.min().item()
+        print(f"{file_name} vs FP32 export cosine similarity: min={min_similarity:.4f} mean={similarities.mean().item():.4f}", flush=True)
+
+        if min_similarity < MIN_COSINE_SIMILARITY:
+            raise SystemExit(f"{file_name} drifted too far from the FP32 export (min cosine < {MIN_COSINE_SIMILARITY})")
+
+
+def main():
+    print(f"Exporting {MODEL_NAME} to ONNX...", flush=True)
+    model = ORTModelForFeatureExtraction.from_pretrained(MODEL_NAME, export=True)
+    model.save_pretrained(MODEL_DIR)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    tokenizer.save_pretrained(MODEL_DIR)
+
+    # O3 fuses LayerNorm, SkipLayerNorm, GELU and the attention block into single ORT ops
+    # (fp16 stays off: that part of O4 only pays off on GPU)
+    print("Applying ORT transformer graph optimizations (O3)...", flush=True)
+    optimizer = ORTOptimizer.from_pretrained(model)
+    optimizer.optimize(save_dir=MODEL_DIR, optimization_config=AutoOptimizationConfig.O3())
+
+    # Dynamic quantization: weights are stored as INT8, activations are quantized on the fly,
+    # so no calibration dataset is needed. Only the nn.Linear layers are quantized (MatMul for
+    # the FFN, plus the QKV projection inside the fused Attention op); the embedding table and
+    # LayerNorms stay FP32 to protect accuracy.
+    print("Applying dynamic INT8 quantization...", flush=True)
+    quantizer = ORTQuantizer.from_pretrained(MODEL_DIR, file_name=OPTIMIZED_FILE)
+    qconfig = AutoQuantizationConfig.avx512_vnni(
+        is_static=False, per_channel=True, operators_to_quantize=["MatMul", "Attention"]
+    )
+    quantizer.quantize(save_dir=MODEL_DIR, quantization_config=qconfig)
+
+    validate(tokenizer)
+
+    print(f"Models written to {os.path.join(MODEL_DIR, OPTIMIZED_FILE)} and {os.path.join(MODEL_DIR, QUANTIZED_FILE)}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
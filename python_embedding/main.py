@@ -1,25 +1,424 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
-from typing import List
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional, Tuple
 
-app = FastAPI()
+import grpc
+import numpy as np
+import onnxruntime as ort
+import orjson
+import psutil
+from tokenizers import Tokenizer
 
-print("Loading embedding model (all-MiniLM-L6-v2)...", flush=True)
-print("This may take a minute on first run while the model downloads (~80MB).", flush=True)
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-print("Embedding model loaded successfully. Ready to serve requests.", flush=True)
+import embedding_pb2
+import embedding_pb2_grpc
 
-class EmbeddingRequest(BaseModel):
-    text: str
+# exported, graph-optimized and quantized by export_model.py
+MODEL_DIR = os.getenv("MODEL_DIR", "onnx_model")
+# "int8" serves the quantized graph; "fp32" serves the unquantized export when embedding
+# fidelity matters more than latency
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "int8")
+MODEL_FILES = {"int8": "model_optimized_quantized.onnx", "fp32": "model_optimized.onnx"}
+# Longer inputs are truncated. Attention cost grows with the square of this, and
+# all-MiniLM-L6-v2 was trained on 128-token inputs, so tokens past that add little signal.
+# The start is dropped, not the end: the proxy embeds whole conversations, system message first,
+# so keeping the start would give every conversation that shares a long system prompt the same
+# vector. The tradeoff: prompts that only differ before their last MAX_SEQ_LENGTH tokens embed identically.
+MAX_SEQ_LENGTH = int(os.getenv("MAX_SEQ_LENGTH", "128"))
+EMBEDDING_DIM = 384
+# requests arriving within MAX_WAIT_MS of each other are encoded in one forward pass
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("MAX_WAIT_MS", "5"))
+# forward passes allowed to run at once; each already uses every physical core through ORT's
+# intra-op pool, so raising this mostly helps machines with many cores
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# number of embeddings kept in memory (~1.5KB each)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "50000"))
+# number of tokenized texts kept in memory, so texts evicted from (or not yet in) the embedding
+# cache still skip the tokenizer
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "100000"))
+# Texts whose embedding is at least this similar to a recent centroid get the centroid back,
+# so paraphrases share one vector. Effectively lowers the proxy's semantic match threshold to
+# this value, so it is off by default (0); 0.86 groups paraphrases well for all-MiniLM-L6-v2.
+CENTROID_THRESHOLD = float(os.getenv("CENTROID_THRESHOLD", "0"))
+CENTROID_CAPACITY = int(os.getenv("CENTROID_CAPACITY", "1024"))
+# gRPC Embed endpoint (proto/embedding.proto) served alongside HTTP; 0 disables it
+GRPC_PORT = int(os.getenv("GRPC_PORT", "8002"))
 
-class EmbeddingResponse(BaseModel):
-    embedding: List[float]
+app = FastAPI(default_response_class=ORJSONResponse)
 
-@app.post("/embed")
-async def get_embedding(request: EmbeddingRequest) -> EmbeddingResponse:
-    embedding = model.encode(request.text)
-    return EmbeddingResponse(embedding = embedding.tolist())
+if EMBEDDING_PRECISION not in MODEL_FILES:
+    raise ValueError(f"EMBEDDING_PRECISION must be one of {sorted(MODEL_FILES)}, got {EMBEDDING_PRECISION!r}")
+if CENTROID_THRESHOLD > 0 and CENTROID_CAPACITY < 1:
+    raise ValueError(f"CENTROID_CAPACITY must be at least 1 when CENTROID_THRESHOLD is set, got {CENTROID_CAPACITY}")
+
+print(f"Loading {EMBEDDING_PRECISION.upper()} ONNX embedding model (all-MiniLM-L6-v2)...", flush=True)
+# One arena shared by all sessions, grown by exactly what is requested instead of doubling,
+# so variable batch shapes don't leave the arena holding oversized chunks between calls
+ort.create_and_register_allocator(
+    ort.OrtMemoryInfo("Cpu", ort.OrtAllocatorType.ORT_ARENA_ALLOCATOR, 0, ort.OrtMemType.DEFAULT),
+    ort.OrtArenaCfg(0, 1, -1, -1),  # max_mem=unlimited, kSameAsRequested, default chunk sizes
+)
+
+sess_options = ort.SessionOptions()
+# hyperthreads share the same vector units, so GEMMs don't gain from them
+sess_options.intra_op_num_threads = psutil.cpu_count(logical=False) or os.cpu_count()
+# the graph is a single chain of encoder layers, so parallelism comes from inside each op;
+# running independent branches concurrently would only oversubscribe the intra-op pool
+sess_options.inter_op_num_threads = 1
+sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+sess_options.add_session_config_entry("session.use_env_allocators", "1")
+session = ort.InferenceSession(
+    os.path.join(MODEL_DIR, MODEL_FILES[EMBEDDING_PRECISION]),
+    sess_options,
+    providers=["CPUExecutionProvider"],
+)
+session_input_names = {i.name for i in session.get_inputs()}
+session_output_name = session.get_outputs()[0].name
+
+# per-thread output buffer sized for the largest possible batch, reused by every forward
+output_buffers = threading.local()
+
+tokenizer = Tokenizer.from_file(os.path.join(MODEL_DIR, "tokenizer.json"))
+tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH, direction="left")
+tokenizer.no_padding()  # encode() pads each length bucket itself
+pad_token_id = tokenizer.token_to_id("[PAD]")
+print("Embedding model loaded successfully.", flush=True)
+
+# "float" returns {"embedding": [...]}; "float16" returns the raw little-endian FP16 vector
+# (768 bytes) instead of a JSON list; "int8" returns {"embedding_int8": base64, "scale": ...}
+# where embedding ~= int8 values * scale (384 bytes, ready for int8 vector stores)
+EMBEDDING_FORMATS = ("float", "float16", "int8")
+# embeddings are L2-normalized, so every component is already within [-1, 1]
+INT8_SCALE = 1 / 127.0
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry. Only touched from the event loop."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+# blake2b(text) -> normalized embedding, so repeated texts skip the model entirely
+embedding_cache = LRUCache(EMBEDDING_CACHE_SIZE)
+
+# blake2b(text) -> (input_ids, token_type_ids), stored as int32 to halve memory
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+
+class CentroidIndex:
+    """Running-mean centroids of recent embeddings. Only touched from the event loop."""
+
+    def __init__(self, capacity: int, threshold: float):
+        self.threshold = threshold
+        self.centroids = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self.counts = np.zeros(capacity, dtype=np.int64)
+        # cosine similarity between every pair of centroids (-inf on the diagonal and for empty
+        # slots), kept current so merging the closest pair when full is a scan, not a GEMM
+        self.pair_similarity = np.full((capacity, capacity), -np.inf, dtype=np.float32)
+        self.size = 0
+
+    def assign(self, embedding: np.ndarray) -> np.ndarray:
+        if self.size:
+            similarities = self.centroids[:self.size] @ embedding
+            nearest = int(np.argmax(similarities))
+            if similarities[nearest] >= self.threshold:
+                self.absorb(nearest, embedding, 1)
+                return self.centroids[nearest].copy()
+
+        if self.size == len(self.centroids):
+            self.merge_closest_pair()
+        self.size += 1
+        self.set(self.size - 1, embedding, 1)
+        return embedding
+
+    def set(self, slot: int, centroid: np.ndarray, count: int):
+        self.centroids[slot] = centroid
+        self.counts[slot] = count
+        row = self.centroids[:self.size] @ centroid
+        row[slot] = -np.inf
+        self.pair_similarity[slot, :self.size] = row
+        self.pair_similarity[:self.size, slot] = row
+
+    def absorb(self, slot: int, embedding: np.ndarray, weight: int):
+        total = self.counts[slot] + weight
+        merged = self.centroids[slot] * self.counts[slot] + embedding * weight
+        self.set(slot, merged / np.linalg.norm(merged), total)
+
+    def merge_closest_pair(self):
+        # agglomerative step: fold the two most similar centroids into one to free a slot
+        n = self.size
+        keep, drop = np.unravel_index(np.argmax(self.pair_similarity[:n, :n]), (n, n))
+        self.absorb(keep, self.centroids[drop], self.counts[drop])
+
+        # move the last centroid into the freed slot so active slots stay contiguous
+        last = n - 1
+        if drop != last:
+            self.centroids[drop] = self.centroids[last]
+            self.counts[drop] = self.counts[last]
+            self.pair_similarity[drop, :] = self.pair_similarity[last, :]
+            self.pair_similarity[:, drop] = self.pair_similarity[:, last]
+            self.pair_similarity[drop, drop] = -np.inf
+        self.pair_similarity[last, :] = -np.inf
+        self.pair_similarity[:, last] = -np.inf
+        self.size -= 1
+
+centroid_index = CentroidIndex(CENTROID_CAPACITY, CENTROID_THRESHOLD) if CENTROID_THRESHOLD > 0 else None
+
+def text_key(text: str) -> bytes:
+    # fixed-size digest keeps memory bounded regardless of prompt length
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+def tokenize(texts: List[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    keys = [text_key(text) for text in texts]
+    tokens = [token_cache.get(key) for key in keys]
+
+    misses = [i for i, t in enumerate(tokens) if t is None]
+    if misses:
+        for i, encoding in zip(misses, tokenizer.encode_batch([texts[i] for i in misses])):
+            tokens[i] = (np.array(encoding.ids, dtype=np.int32), np.array(encoding.type_ids, dtype=np.int32))
+            token_cache.put(keys[i], tokens[i])
+    return tokens
+
+def length_buckets(order: List[int], lengths: List[int]) -> List[List[int]]:
+    # order is sorted by length; start a new bucket once a sequence is more than 2x the
+    # shortest one in the current bucket, so short requests aren't padded up to long ones
+    buckets = [[order[0]]]
+    for i in order[1:]:
+        if lengths[i] > 2 * lengths[buckets[-1][0]]:
+            buckets.append([i])
+        else:
+            buckets[-1].append(i)
+    return buckets
+
+def output_buffer(shape: Tuple[int, int, int]) -> np.ndarray:
+    buffer = getattr(output_buffers, "buffer", None)
+    if buffer is None:
+        buffer = np.empty(MAX_BATCH * MAX_SEQ_LENGTH * EMBEDDING_DIM, dtype=np.float32)
+        output_buffers.buffer = buffer
+    # a contiguous prefix of the flat buffer, so ORT can write into it directly
+    return buffer[:np.prod(shape)].reshape(shape)
+
+def run_model(tokens) -> np.ndarray:
+    # pad to the longest sequence in this bucket only
+    max_len = max(len(ids) for ids, _ in tokens)
+    input_ids = np.full((len(tokens), max_len), pad_token_id, dtype=np.int64)
+    attention_mask = np.zeros((len(tokens), max_len), dtype=np.int64)
+    token_type_ids = np.zeros((len(tokens), max_len), dtype=np.int64)
+    for row, (ids, type_ids) in enumerate(tokens):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+        token_type_ids[row, :len(ids)] = type_ids
+
+    feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+    if "token_type_ids" in session_input_names:
+        feeds["token_type_ids"] = token_type_ids
+
+    token_embeddings = output_buffer((len(tokens), max_len, EMBEDDING_DIM))
+    binding = session.io_binding()
+    for name, value in feeds.items():
+        binding.bind_cpu_input(name, value)
+    binding.bind_output(
+        session_output_name, "cpu", 0, np.float32, token_embeddings.shape, token_embeddings.ctypes.data
+    )
+    session.run_with_iobinding(binding)
+
+    # mean pooling over real tokens + L2 normalize, matching SentenceTransformer's output.
+    # mask @ hidden is one batched GEMV instead of materializing a masked (batch, seq, dim) copy
+    mask = attention_mask.astype(np.float32)
+    pooled = np.matmul(mask[:, np.newaxis, :], token_embeddings)[:, 0, :]
+    pooled /= np.clip(mask.sum(axis=1, keepdims=True), 1e-9, None)
+    pooled /= np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled
+
+def encode(tokens) -> np.ndarray:
+    lengths = [len(ids) for ids, _ in tokens]
+    order = sorted(range(len(tokens)), key=lengths.__getitem__)
+
+    # run each bucket separately and scatter the rows back to request order
+    embeddings = np.empty((len(tokens), EMBEDDING_DIM), dtype=np.float32)
+    for bucket in length_buckets(order, lengths):
+        embeddings[bucket] = run_model([tokens[i] for i in bucket])
+    return embeddings
+
+# (text, future) pairs waiting for the batch worker; created on startup inside the event loop
+embed_queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+batch_worker_task: Optional[asyncio.Task] = None
+# forward passes run here, off the event loop; ORT releases the GIL while it computes
+inference_executor: Optional[ThreadPoolExecutor] = None
+# limits batches in flight to the executor size, so the worker only runs one batch ahead
+inference_slots: Optional[asyncio.Semaphore] = None
+inference_tasks = set()
+
+def fail_batch(batch, error: Exception):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+async def run_batch(batch, tokens, rows: List[int]):
+    try:
+        embeddings = await asyncio.get_running_loop().run_in_executor(inference_executor, encode, tokens)
+    except Exception as e:
+        fail_batch(batch, e)
+        return
+    finally:
+        inference_slots.release()
+
+    for (_, future), row in zip(batch, rows):
+        # the client may have disconnected and cancelled the future
+        if not future.done():
+            future.set_result(embeddings[row])
+
+async def batch_worker():
+    loop = asyncio.get_running_loop()
+
+    while True:
+        # block until there is work, then keep collecting until the batch is full or the window closes
+        batch = [await embed_queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(embed_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # identical texts in one batch (e.g. the same prompt fired concurrently, before the first
+        # one reached the embedding cache) are encoded once; rows maps each request to its result
+        unique_rows = {}
+        rows = [unique_rows.setdefault(text, len(unique_rows)) for text, _ in batch]
+
+        # tokenize (or fetch cached tokens) here on the loop thread while the previous batch's
+        # forward pass is still running in the executor, then hand off only the model work
+        try:
+            tokens = tokenize(list(unique_rows))
+        except Exception as e:
+            fail_batch(batch, e)
+            continue
+
+        await inference_slots.acquire()
+        task = asyncio.create_task(run_batch(batch, tokens, rows))
+        inference_tasks.add(task)
+        task.add_done_callback(inference_tasks.discard)
+
+WARMUP_TEXT = "user: How do I fix 'borrowed value does not live long enough' in my Rust web server?"
+
+def warm_up(tokens):
+    # the first runs pay for arena growth, kernel selection and thread-pool spin-up; the full
+    # batch also sizes this thread's output buffer and the arena for the largest common shape
+    for _ in range(3):
+        encode(tokens)
+    encode(tokens * MAX_BATCH)
+
+async def embed_text(text: str) -> np.ndarray:
+    key = text_key(text)
+    embedding = embedding_cache.get(key)
+    if embedding is None:
+        future = asyncio.get_running_loop().create_future()
+        await embed_queue.put((text, future))
+        # copy so the cached row doesn't keep the whole batch array alive
+        embedding = np.array(await future)
+        # concurrent requests for this text all missed above; the first to resume caches the
+        # result, the rest reuse it so the centroid index only counts the text once
+        cached = embedding_cache.get(key)
+        if cached is not None:
+            return cached
+        # cache what was returned, so exact repeats keep getting the same vector
+        if centroid_index is not None:
+            embedding = centroid_index.assign(embedding)
+        embedding_cache.put(key, embedding)
+    return embedding
+
+class Embedder(embedding_pb2_grpc.EmbedderServicer):
+    async def Embed(self, request, context):
+        embedding = await embed_text(request.text)
+        return embedding_pb2.EmbedResponse(embedding=embedding.astype("<f2").tobytes(), dim=embedding.shape[0])
+
+grpc_server: Optional[grpc.aio.Server] = None
+
+@app.on_event("startup")
+async def start_batch_worker():
+    global embed_queue, batch_worker_task, inference_executor, inference_slots
+    embed_queue = asyncio.Queue()
+    inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+    inference_slots = asyncio.Semaphore(INFERENCE_WORKERS)
+
+    print("Warming up embedding model...", flush=True)
+    await asyncio.get_running_loop().run_in_executor(inference_executor, warm_up, tokenize([WARMUP_TEXT]))
+    print("Warm-up complete. Ready to serve requests.", flush=True)
+
+    batch_worker_task = asyncio.create_task(batch_worker())
+
+@app.on_event("startup")
+async def start_grpc_server():
+    global grpc_server
+    if GRPC_PORT == 0:
+        return
+    # grpc.aio shares uvicorn's event loop, so both protocols feed the same batcher and cache
+    grpc_server = grpc.aio.server()
+    embedding_pb2_grpc.add_EmbedderServicer_to_server(Embedder(), grpc_server)
+    grpc_server.add_insecure_port(f"[::]:{GRPC_PORT}")
+    await grpc_server.start()
+    print(f"gRPC Embed service listening on port {GRPC_PORT}", flush=True)
+
+@app.on_event("shutdown")
+async def stop_batch_worker():
+    if grpc_server is not None:
+        await grpc_server.stop(grace=None)
+    batch_worker_task.cancel()
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+
+# The response shape depends on "format", so it is described here rather than with a response_model
+EMBED_RESPONSES = {
+    200: {
+        "description": 'format="float": {"embedding": [...]}; format="int8": {"embedding_int8": base64, '
+        '"scale": float}; format="float16": the raw little-endian FP16 vector',
+        "content": {"application/json": {}, "application/octet-stream": {}},
+    },
+}
+
+# Request body: {"text": str, "format": "float" | "float16" | "int8" (optional)}. Parsed by hand rather
+# than through a Pydantic model — this is the hot path and the payload is two fields.
+@app.post("/embed", responses=EMBED_RESPONSES)
+async def get_embedding(raw: Request):
+    try:
+        body = orjson.loads(await raw.body())
+        text = body["text"]
+        embedding_format = body.get("format", "float")
+    except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=422, detail='Expected a JSON body like {"text": "..."}')
+    if not isinstance(text, str) or embedding_format not in EMBEDDING_FORMATS:
+        raise HTTPException(status_code=422, detail=f"text must be a string and format one of {EMBEDDING_FORMATS}")
+
+    embedding = await embed_text(text)
+
+    if embedding_format == "float16":
+        return Response(content=embedding.astype("<f2").tobytes(), media_type="application/octet-stream")
+    if embedding_format == "int8":
+        quantized = np.clip(np.rint(embedding / INT8_SCALE), -127, 127).astype(np.int8)
+        return ORJSONResponse({"embedding_int8": base64.b64encode(quantized.tobytes()).decode(), "scale": INT8_SCALE})
+    # orjson serializes the float32 ndarray directly, no intermediate Python list
+    return ORJSONResponse({"embedding": embedding})
 
 @app.get("/health")
 async def health():
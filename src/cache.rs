@@ -3,15 +3,24 @@ use crate::models::LLMRequest;
 use redis::aio::ConnectionManager;
 use redis::AsyncCommands;
 use reqwest::Client;
-use serde_json::{Value, json};
+use serde_json::json;
 use qdrant_client::Qdrant;
 use qdrant_client::qdrant::{
     CreateCollectionBuilder, Distance, VectorParamsBuilder,
-    SearchPointsBuilder, PointStruct, UpsertPointsBuilder
+    SearchPointsBuilder, PointStruct, UpsertPointsBuilder,
+    ScalarQuantizationBuilder, QuantizationType
 };
 use qdrant_client::qdrant::value::Kind;
+use tonic::transport::Channel;
 use uuid::Uuid;
 
+pub mod embedding_proto {
+    tonic::include_proto!("embedding");
+}
+
+use embedding_proto::EmbedRequest;
+use embedding_proto::embedder_client::EmbedderClient;
+
 const CACHE_TTL_SECONDS: u64 = 86400;
 
 pub fn generate_cache_key(request: &LLMRequest) -> String {
@@ -130,9 +139,17 @@ impl QdrantCache {
         let client = Qdrant::from_url(qdrant_url).build()?;
         let collection_name = "llm_cache".to_string();
 
-        // create collection if it doesn't exist
+        // create collection if it doesn't exist. Vectors are also kept as INT8 in RAM
+        // (4x smaller than f32) for the similarity scan; the top candidates are rescored
+        // against the original vectors, so the 0.90 threshold still applies to exact scores
         match client.create_collection(CreateCollectionBuilder::new(&collection_name)
-            .vectors_config(VectorParamsBuilder::new(384, Distance::Cosine)))
+            .vectors_config(VectorParamsBuilder::new(384, Distance::Cosine))
+            .quantization_config(
+                ScalarQuantizationBuilder::default()
+                    .r#type(QuantizationType::Int8.into())
+                    .quantile(0.99)
+                    .always_ram(true)
+            ))
             .await
         {
             Ok(_) => {}
@@ -227,19 +244,52 @@ pub async fn get_embedding(
     text: &str
 ) -> Result<Vec<f32>, Box<dyn std::error::Error + Send + Sync>> {
 
+    // ask for the raw FP16 vector — 768 bytes instead of ~8KB of JSON floats
     let response = http_client
         .post(embedding_url)
-        .json(&json!({"text": text}))
+        .json(&json!({"text": text, "format": "float16"}))
         .send()
         .await?;
 
-    let result: Value = response.json().await?;
+    let bytes = response.error_for_status()?.bytes().await?;
+
+    decode_f16_embedding(&bytes)
 
-    let embedding: Vec<f32> = result["embedding"]
-        .as_array()
-        .ok_or("No embedding in response")?
-        .iter()
-        .filter_map(|v| v.as_f64().map(|f| f as f32))
+}
+
+// same embedding over gRPC (HTTP/2) — no per-request JSON body or HTTP/1.1 headers to parse,
+// and concurrent calls are multiplexed on one connection
+pub async fn get_embedding_grpc(
+    grpc_client: &EmbedderClient<Channel>,
+    text: &str
+) -> Result<Vec<f32>, Box<dyn std::error::Error + Send + Sync>> {
+
+    // clients are cheap handles onto the shared channel
+    let mut client = grpc_client.clone();
+    let response = client
+        .embed(EmbedRequest { text: text.to_string() })
+        .await?
+        .into_inner();
+
+    let embedding = decode_f16_embedding(&response.embedding)?;
+    if embedding.len() != response.dim as usize {
+        return Err(format!("Expected {} dimensions, got {}", response.dim, embedding.len()).into());
+    }
+
+    Ok(embedding)
+
+}
+
+// little-endian FP16 bytes -> f32 vector
+fn decode_f16_embedding(bytes: &[u8]) -> Result<Vec<f32>, Box<dyn std::error::Error + Send + Sync>> {
+
+    if bytes.is_empty() || bytes.len() % 2 != 0 {
+        return Err(format!("Invalid FP16 embedding payload ({} bytes)", bytes.len()).into());
+    }
+
+    let embedding = bytes
+        .chunks_exact(2)
+        .map(|pair| half::f16::from_le_bytes([pair[0], pair[1]]).to_f32())
         .collect();
 
     Ok(embedding)
@@ -301,6 +351,19 @@ mod tests {
 
     }
 
+    #[test]
+    fn test_decode_f16_embedding() {
+
+        // 1.0 = 0x3C00, -2.0 = 0xC000, 0.5 = 0x3800 (little-endian)
+        let bytes = [0x00, 0x3C, 0x00, 0xC0, 0x00, 0x38];
+        let embedding = decode_f16_embedding(&bytes).expect("Failed to decode");
+
+        assert_eq!(embedding, vec![1.0, -2.0, 0.5]);
+        assert!(decode_f16_embedding(&[0x00, 0x3C, 0x00]).is_err(), "Odd length should be rejected");
+        assert!(decode_f16_embedding(&[]).is_err(), "Empty payload should be rejected");
+
+    }
+
     #[tokio::test]
     async fn test_get_embedding() {
         let client = Client::new();
@@ -0,0 +1,144 @@
+use std::path::Path;
+use std::sync::Arc;
+use ort::session::Session;
+use ort::session::builder::GraphOptimizationLevel;
+use ort::value::Tensor;
+use tokenizers::{Tokenizer, TruncationDirection, TruncationParams};
+
+// same defaults as the Python service, read from the same EMBEDDING_PRECISION and
+// MAX_SEQ_LENGTH variables, so vectors from either path can share one Qdrant collection
+const DEFAULT_MAX_SEQ_LENGTH: usize = 128;
+const DEFAULT_PRECISION: &str = "int8";
+
+// written by python_embedding/export_model.py (see MODEL_FILES in python_embedding/main.py)
+const MODEL_FILES: [(&str, &str); 2] = [
+    ("int8", "model_optimized_quantized.onnx"),
+    ("fp32", "model_optimized.onnx")
+];
+const TOKENIZER_FILE: &str = "tokenizer.json";
+
+type BoxError = Box<dyn std::error::Error + Send + Sync>;
+
+// Runs the embedding model inside the proxy with ONNX Runtime — the same graph the
+// Python service serves, without the HTTP/gRPC hop and serialization on every request
+pub struct LocalEmbedder {
+    session: Session,
+    tokenizer: Tokenizer
+}
+
+impl LocalEmbedder {
+
+    pub fn new(model_dir: &str) -> Result<Self, BoxError> {
+
+        let model_dir = Path::new(model_dir);
+
+        let precision = std::env::var("EMBEDDING_PRECISION")
+            .unwrap_or_else(|_| DEFAULT_PRECISION.to_string());
+        let model_file = MODEL_FILES.iter()
+            .find(|(name, _)| *name == precision)
+            .map(|(_, file)| *file)
+            .ok_or_else(|| format!("EMBEDDING_PRECISION must be int8 or fp32, got {:?}", precision))?;
+
+        let max_seq_length = match std::env::var("MAX_SEQ_LENGTH") {
+            Ok(value) => value.parse::<usize>().ok()
+                .filter(|&n| n > 0)
+                .ok_or_else(|| format!("MAX_SEQ_LENGTH must be a positive integer, got {:?}", value))?,
+            Err(_) => DEFAULT_MAX_SEQ_LENGTH
+        };
+
+        let intra_threads = std::thread::available_parallelism()
+            .map(|n| n.get())
+            .unwrap_or(1);
+
+        let session = Session::builder()?
+            .with_optimization_level(GraphOptimizationLevel::Level3)?
+            .with_intra_threads(intra_threads)?
+            .commit_from_file(model_dir.join(model_file))?;
+
+        // one text per call, so no padding is needed; like the Python service, keep the end of
+        // long prompts so a shared system message doesn't crowd out the question
+        let mut tokenizer = Tokenizer::from_file(model_dir.join(TOKENIZER_FILE))?;
+        tokenizer.with_truncation(Some(TruncationParams {
+            max_length: max_seq_length,
+            direction: TruncationDirection::Left,
+            ..Default::default()
+        }))?;
+        tokenizer.with_padding(None);
+
+        Ok(LocalEmbedder { session, tokenizer })
+
+    }
+
+    pub fn embed(&self, text: &str) -> Result<Vec<f32>, BoxError> {
+
+        let encoding = self.tokenizer.encode(text, true)?;
+        let seq_len = encoding.get_ids().len();
+
+        let to_i64 = |values: &[u32]| values.iter().map(|&v| v as i64).collect::<Vec<i64>>();
+
+        let outputs = self.session.run(ort::inputs![
+            "input_ids" => Tensor::from_array(([1, seq_len], to_i64(encoding.get_ids())))?,
+            "attention_mask" => Tensor::from_array(([1, seq_len], to_i64(encoding.get_attention_mask())))?,
+            "token_type_ids" => Tensor::from_array(([1, seq_len], to_i64(encoding.get_type_ids())))?,
+        ]?)?;
+
+        let (_, hidden_state) = outputs["last_hidden_state"].try_extract_raw_tensor::<f32>()?;
+
+        Ok(mean_pool_normalize(hidden_state, seq_len))
+
+    }
+
+}
+
+// mean over the token rows of a (seq_len, dim) hidden state, then L2 normalize —
+// matches the Python service's output (no padding, so every token counts)
+fn mean_pool_normalize(hidden_state: &[f32], seq_len: usize) -> Vec<f32> {
+
+    let dim = hidden_state.len() / seq_len;
+    let mut pooled = vec![0.0f32; dim];
+
+    for token in hidden_state.chunks_exact(dim) {
+        for (sum, value) in pooled.iter_mut().zip(token) {
+            *sum += value;
+        }
+    }
+
+    let norm = pooled.iter().map(|v| v * v).sum::<f32>().sqrt().max(1e-12);
+    pooled.iter_mut().for_each(|v| *v /= norm);
+
+    pooled
+
+}
+
+pub async fn get_embedding_local(
+    embedder: &Arc<LocalEmbedder>,
+    text: &str
+) -> Result<Vec<f32>, BoxError> {
+
+    // inference is CPU-bound, keep it off the async runtime's worker threads
+    let embedder = Arc::clone(embedder);
+    let text = text.to_string();
+
+    tokio::task::spawn_blocking(move || embedder.embed(&text)).await?
+
+}
+
+#[cfg(test)]
+mod tests {
+
+    use super::*;
+
+    #[test]
+    fn test_mean_pool_normalize() {
+
+        // two tokens, dim 2: mean = [2.0, 0.0] -> normalized [1.0, 0.0]
+        let pooled = mean_pool_normalize(&[1.0, 1.0, 3.0, -1.0], 2);
+        assert_eq!(pooled, vec![1.0, 0.0]);
+
+        // mean = [3.0, 4.0] -> normalized [0.6, 0.8]
+        let pooled = mean_pool_normalize(&[3.0, 4.0], 1);
+        assert!((pooled[0] - 0.6).abs() < 1e-6 && (pooled[1] - 0.8).abs() < 1e-6);
+
+    }
+
+}
\ No newline at end of file
@@ -3,7 +3,8 @@ use axum::http::StatusCode;
 use chrono::Utc;
 use crate::models::{LLMRequest, LLMResponse};
 use crate::client::call_llm;
-use crate::cache::{generate_cache_key, get_embedding};
+use crate::cache::{generate_cache_key, get_embedding, get_embedding_grpc};
+use crate::embedder::get_embedding_local;
 use crate::AppState;
 use serde_json::json;
 use crate::logger::log_request;
@@ -50,7 +51,8 @@ pub async fn health_check(State(state): State<AppState>) -> impl IntoResponse {
     let (redis_up, qdrant_up, embeddings_up) = tokio::join!(
         state.redis_cache.health_check(),
         state.qdrant_cache.health_check(),
-        check_embedding_service(&state.http_client, &state.embedding_url)
+        // the embedding service isn't needed when embedding in-process
+        async { state.local_embedder.is_some() || check_embedding_service(&state.http_client, &state.embedding_url).await }
     );
 
     let all_healthy = redis_up && qdrant_up && embeddings_up;
@@ -136,7 +138,13 @@ pub async fn proxy_handler(
         .join("\n");
 
     // get embedding — stored so it can be reused for Qdrant storage on a cache miss
-    let maybe_embedding = get_embedding(&state.http_client, &state.embedding_url, &prompt_text).await;
+    let maybe_embedding = if let Some(embedder) = &state.local_embedder {
+        get_embedding_local(embedder, &prompt_text).await
+    } else if let Some(grpc_client) = &state.embedding_grpc_client {
+        get_embedding_grpc(grpc_client, &prompt_text).await
+    } else {
+        get_embedding(&state.http_client, &state.embedding_url, &prompt_text).await
+    };
     
     if !bypass_cache {
         match &maybe_embedding {
@@ -310,7 +318,7 @@ pub async fn admin_stats(
     let (redis_up, qdrant_up, embeddings_up) = tokio::join!(
         state.redis_cache.health_check(),
         state.qdrant_cache.health_check(),
-        check_embedding_service(&state.http_client, &state.embedding_url)
+        async { state.local_embedder.is_some() || check_embedding_service(&state.http_client, &state.embedding_url).await }
     );
 
     let snapshot = state.metrics.snapshot();
@@ -4,14 +4,18 @@ mod client;
 mod cache;
 mod metrics;
 mod logger;
+mod embedder;
 
 use std::sync::Arc;
 use axum::{routing::{get, post, Router}};
 use std::net::SocketAddr;
 use tokio::net::TcpListener;
 use cache::{RedisCache, QdrantCache};
+use cache::embedding_proto::embedder_client::EmbedderClient;
 use reqwest::Client;
+use tonic::transport::{Channel, Endpoint};
 use metrics::Metrics;
+use embedder::LocalEmbedder;
 
 // share the cache and http client with all the handles
 // http client is shared to avoid creating a new 
@@ -24,6 +28,10 @@ pub struct AppState {
     pub http_client: Client,
     pub groq_api_key: String,
     pub embedding_url: String,
+    // set when EMBEDDING_GRPC_URL is configured; otherwise embeddings go over HTTP
+    pub embedding_grpc_client: Option<EmbedderClient<Channel>>,
+    // set when EMBEDDING_MODEL_DIR is configured; embeddings are computed in-process
+    pub local_embedder: Option<Arc<LocalEmbedder>>,
     pub metrics: Arc<Metrics>
 }
 
@@ -44,6 +52,26 @@ async fn main() {
     let embedding_url = std::env::var("EMBEDDING_URL")
         .unwrap_or_else(|_| "http://127.0.0.1:8001/embed".to_string());
 
+    // connect lazily so the proxy still starts (and falls back to cache misses) if the
+    // embedding service isn't up yet
+    let embedding_grpc_client = std::env::var("EMBEDDING_GRPC_URL").ok()
+        .map(|url| {
+            let channel = Endpoint::from_shared(url)
+                .expect("EMBEDDING_GRPC_URL must be a valid URI")
+                .connect_lazy();
+            EmbedderClient::new(channel)
+        });
+
+    // in-process embeddings take priority over the embedding service when a model
+    // directory exported by python_embedding/export_model.py is configured
+    let local_embedder = std::env::var("EMBEDDING_MODEL_DIR").ok()
+        .map(|model_dir| {
+            let embedder = LocalEmbedder::new(&model_dir)
+                .expect("Failed to load embedding model from EMBEDDING_MODEL_DIR");
+            println!("Embedding in-process with model from {}", model_dir);
+            Arc::new(embedder)
+        });
+
     // create caches
     let redis_cache = RedisCache::new(&redis_url)
         .await
@@ -64,6 +92,8 @@ async fn main() {
         http_client,
         groq_api_key,
         embedding_url,
+        embedding_grpc_client,
+        local_embedder,
         metrics
     };
     